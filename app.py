@@ -15,136 +15,416 @@ Before running:
  - export GEMINI_API_KEY="your_gemini_api_key"    (on Windows use set)
 """
 
-from typing import List, Tuple
+from typing import Iterator, List, Optional, Tuple
 import os
 import re
 import math
 import streamlit as st
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 import numpy as np
 import time
+import hashlib
+import logging
+import sqlite3
+import tempfile
+import zipfile
+from collections import OrderedDict, deque
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+try:
+    import faiss  # optional: BLAS-backed top-k search; without it search falls back to NumPy
+except ImportError:
+    faiss = None
+
+if faiss is not None:
+    # every search is a single query over a small index; OpenMP threads per search only
+    # oversubscribe the CPU when several sessions query at once
+    faiss.omp_set_num_threads(1)
+
+logger = logging.getLogger(__name__)
 
 # --------- Config ----------
 EMBEDDING_MODEL = "gemini-embedding-001"      # embeddings model
 GENERATION_MODEL = "gemini-2.5-flash"         # text generation model (fast + quality)
+TRANSCRIPT_LANGUAGES = ["en"]                 # transcript languages to look for, in order of preference
 CHUNK_CHAR_SIZE = 2000                        # chunk transcript by approx chars (tuneable)
-TOP_K = 3                                     # number of top chunks to retrieve for each query
+TOP_K = 2                                     # number of chunks sent to Gemini for each query
+CANDIDATE_K = 8                               # chunks retrieved by similarity before MMR picks TOP_K
+MMR_LAMBDA = 0.7                              # MMR trade-off: 1.0 = pure relevance, lower = more diversity
+# at CHUNK_CHAR_SIZE=2000 these are ~8M and ~20M transcript chars: no real video gets there, the two tiers only
+# guard pathological inputs (or a much smaller chunk size); every normal video uses the exact flat index
+IVF_MIN_CHUNKS = 4096                         # use an 8-bit quantized IVF index instead of a flat one from this size
+HNSW_MIN_CHUNKS = 10_000                      # use an HNSW graph index instead of a flat one from this size
+HNSW_M = 32                                   # HNSW graph neighbours per node
+HNSW_EF_SEARCH = 64                           # HNSW search breadth (higher = better recall, slower)
+EMBED_BATCH_SIZE = 100                        # max texts per embed_content request (API cap)
+EMBED_MAX_WORKERS = 8                         # max embed_content requests in flight at once
+EMBED_MAX_RETRIES = 3                         # retries per batch when Gemini rate-limits us (HTTP 429)
+EMBED_MAX_RETRY_DELAY = 30                    # seconds; longer Retry-After values are capped so the UI never stalls
+TRANSCRIPT_CACHE_TTL = 60 * 60                # seconds a fetched transcript text stays cached
+TRANSCRIPT_CACHE_MAX_ENTRIES = 16             # max transcripts kept in the shared transcript cache
+VIDEO_CACHE_DIR = ".cache"                    # on-disk chunks + embeddings per video, survives restarts
+EMBED_CACHE_PATH = os.path.join(VIDEO_CACHE_DIR, "embeddings.sqlite")  # per-chunk embeddings, any video
+ANSWER_CACHE_THRESHOLD = 0.95                 # cosine similarity above which a previous answer is reused
+ANSWER_CACHE_SIZE = 32                        # past answers kept per video (oldest evicted)
+QUERY_EMB_CACHE_SIZE = 128                    # question embeddings kept per session (least recently used evicted)
+CHAT_HISTORY_MAX_TURNS = 20                   # Q/A pairs kept per session (oldest dropped first)
 # --------------------------
 
 # Initialize Gemini client (reads GEMINI_API_KEY from environment by default)
+# One client for the whole server process, so every session reuses its pooled HTTPS connections
+@st.cache_resource(show_spinner=False)
 def get_gemini_client():
     # You may optionally pass api_key=... if you prefer explicit auth
     return genai.Client()
 
+# common YouTube URL patterns, compiled once as a single alternation:
+#   v=VIDEOID or /VIDEOID  |  plain id at end
+# a v=/ match always starts before the end-anchored one can, so search() keeps the old precedence
+_VIDEO_ID_RE = re.compile(r"(?:v=|\/)([0-9A-Za-z_-]{11})|([0-9A-Za-z_-]{11})$")
+
 # Utility: extract video id from YouTube URL or raw id
 def extract_video_id(url_or_id: str) -> str:
-    # common YouTube URL patterns
-    patterns = [
-        r"(?:v=|\/)([0-9A-Za-z_-]{11})",          # v=VIDEOID or /VIDEOID
-        r"([0-9A-Za-z_-]{11})$"                   # plain id at end
-    ]
-    for p in patterns:
-        m = re.search(p, url_or_id)
-        if m:
-            return m.group(1)
+    m = _VIDEO_ID_RE.search(url_or_id)
+    if m:
+        return m.group(1) or m.group(2)
     # fallback: assume the user typed the id
     return url_or_id.strip()
 
-# Get transcript text (joined) and also keep segments with timestamps
-def fetch_transcript(video_id: str) -> Tuple[str, List[dict]]:
-    # Returns (full_text, segments)
-    # segments: list of dicts with 'text' and 'start' (seconds)
-    transcript = YouTubeTranscriptApi.fetch(video_id)  # may raise exceptions
-    # transcript is a list of {"text": "...", "start": ..., "duration": ...}
-    full_text = " ".join(segment["text"].strip() for segment in transcript)
-    return full_text, transcript
+# Get transcript text (segments joined; timestamps are not kept)
+# This only runs when the video's .npz cache misses, so the in-memory cache is small and short-lived:
+# it covers retrying a load whose embedding step failed, without another YouTube round-trip
+@st.cache_data(ttl=TRANSCRIPT_CACHE_TTL, max_entries=TRANSCRIPT_CACHE_MAX_ENTRIES, show_spinner=False)
+def fetch_transcript(video_id: str) -> str:
+    # List the available tracks first (raises TranscriptsDisabled), so a video without a usable
+    # track fails before any transcript download; prefer a human-made track over auto-generated
+    transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+    try:
+        transcript = transcript_list.find_manually_created_transcript(TRANSCRIPT_LANGUAGES)
+    except NoTranscriptFound:
+        transcript = transcript_list.find_generated_transcript(TRANSCRIPT_LANGUAGES)  # may raise NoTranscriptFound
+    segments = transcript.fetch()
+    # segments is a list of {"text": "...", "start": ..., "duration": ...}
+    return " ".join(segment["text"].strip() for segment in segments)
+
 
+# sentence boundaries for chunk_text: after ./?/! followed by whitespace, or at a newline
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[\.\?\!]\s)|\n')
 
 # Chunk text into roughly CHUNK_CHAR_SIZE sized chunks, but keep sentence boundaries if possible
 def chunk_text(text: str, chunk_size: int = CHUNK_CHAR_SIZE) -> List[str]:
     # naive chunker that tries to split on sentence boundaries (period, newline)
-    sentences = re.split(r'(?<=[\.\?\!]\s)|\n', text)
+    # the split yields empty pieces around blank lines; they would only add stray spaces
+    sentences = [s for s in _SENTENCE_SPLIT_RE.split(text) if s.strip()]
+    # ends[i] = length of " ".join(sentences[:i+1]) + 1, so sentences[a:b] joined is
+    # ends[b-1] - ends[a-1] - 1 chars long and each chunk's end is one binary search
+    ends = np.cumsum(np.fromiter((len(s) + 1 for s in sentences), dtype=np.int64, count=len(sentences)))
     chunks = []
-    cur = ""
-    for s in sentences:
-        if len(cur) + len(s) + 1 <= chunk_size:
-            cur += (" " + s) if cur else s
+    start = 0
+    while start < len(sentences):
+        base = ends[start - 1] if start else 0
+        # greedily take as many whole sentences as fit in chunk_size
+        end = int(np.searchsorted(ends, base + chunk_size + 1, side="right"))
+        if end > start:
+            chunks.append(" ".join(sentences[start:end]).strip())
+            start = end
         else:
-            if cur:
-                chunks.append(cur.strip())
-            # if this sentence itself is very large, split it directly
-            if len(s) > chunk_size:
-                for i in range(0, len(s), chunk_size):
-                    chunks.append(s[i:i+chunk_size].strip())
-                cur = ""
-            else:
-                cur = s
-    if cur:
-        chunks.append(cur.strip())
+            # this sentence alone is longer than chunk_size, split it directly
+            s = sentences[start]
+            for i in range(0, len(s), chunk_size):
+                chunks.append(s[i:i+chunk_size].strip())
+            start += 1
     return chunks
 
+# Seconds to wait before retrying a rate-limited call: the server's Retry-After if it sent one,
+# otherwise exponential backoff (1s, 2s, 4s, ...), clamped to [0, EMBED_MAX_RETRY_DELAY]
+def _retry_delay(error: errors.APIError, attempt: int) -> float:
+    headers = getattr(error.response, "headers", None) or {}
+    try:
+        delay = float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        delay = float(2 ** attempt)
+    return float(min(EMBED_MAX_RETRY_DELAY, max(0.0, delay)))
+
+# Scale each row of a float32 matrix to unit length, in place (zero rows are left as-is);
+# einsum gives the row sums of squares in one pass without materializing embeddings**2
+def _normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.einsum("ij,ij->i", embeddings, embeddings)
+    np.sqrt(norms, out=norms)
+    norms[norms == 0] = 1.0
+    embeddings /= norms[:, None]
+    return embeddings
+
 # Create embeddings for a list of texts using Gemini embeddings
 def create_embeddings(client, texts: List[str], model=EMBEDDING_MODEL) -> np.ndarray:
     """
     Returns numpy array of shape (len(texts), dim)
     """
-    # Gemini embed_content supports lists
+    if not texts:
+        # nothing to send (and no response to learn dim from); don't spin up an empty thread pool
+        return np.empty((0, 0), dtype=np.float32)
+    # Gemini embed_content supports lists, but caps the number of inputs per request,
+    # so long transcripts are split into batches and the batches are sent concurrently
     # config can specify output_dimensionality if you want smaller vector sizes
-    res = client.models.embed_content(model=model, contents=texts)
-    # docs: result.embeddings is a list of lists (one per input)
-    embeddings = np.array([np.array(e) for e in res.embeddings])
+    starts = range(0, len(texts), EMBED_BATCH_SIZE)
+    batches = [texts[i:i+EMBED_BATCH_SIZE] for i in starts]
+
+    def embed_batch(batch: List[str]) -> List[List[float]]:
+        # concurrent batches can trip the per-minute quota; retry just the rate-limited batch
+        for attempt in range(EMBED_MAX_RETRIES + 1):
+            try:
+                res = client.models.embed_content(model=model, contents=batch)
+                break
+            except errors.APIError as e:
+                if e.code != 429 or attempt == EMBED_MAX_RETRIES:
+                    raise
+                time.sleep(_retry_delay(e, attempt))
+        # result.embeddings is a list of ContentEmbedding objects (one per input), vector in .values
+        return [e.values for e in res.embeddings]
+
+    # float32 halves memory vs NumPy's default float64 and still runs through BLAS sgemv in search
+    if len(batches) == 1:
+        # asarray on the list of float lists builds the matrix in a single allocation
+        embeddings = np.asarray(embed_batch(batches[0]), dtype=np.float32)
+    else:
+        embeddings = None
+        with ThreadPoolExecutor(max_workers=min(EMBED_MAX_WORKERS, len(batches))) as pool:
+            # map preserves batch order; each batch is copied straight into its rows of one
+            # preallocated contiguous matrix instead of being flattened into a list first
+            for start, batch_vectors in zip(starts, pool.map(embed_batch, batches)):
+                if embeddings is None:
+                    embeddings = np.empty((len(texts), len(batch_vectors[0])), dtype=np.float32)
+                embeddings[start:start+len(batch_vectors)] = batch_vectors
     # normalize to unit vectors to make cosine similarity fast (dot product)
-    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
-    norms[norms == 0] = 1.0
-    embeddings = embeddings / norms
-    return embeddings
+    return _normalize_rows(embeddings)
+
+# Persistent per-chunk embedding cache keyed by sha1(model + chunk text), stored as float16 blobs.
+# Sits behind the per-video .npz: it hits when a chunk's exact text was embedded before, e.g. a video
+# whose .npz is missing or unreadable, or boilerplate repeated across videos. Only the misses go to
+# Gemini, in one batch pass. Best-effort: any SQLite/filesystem error is logged and the cache skipped.
+def _embedding_cache_key(text: str, model: str) -> str:
+    return hashlib.sha1((model + "\x00" + text).encode("utf-8")).hexdigest()
+
+def _open_embedding_cache() -> sqlite3.Connection:
+    os.makedirs(VIDEO_CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(EMBED_CACHE_PATH, timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+    return conn
+
+def _read_cached_embeddings(keys: List[str]) -> dict:
+    found = {}
+    with closing(_open_embedding_cache()) as conn:
+        # stay well under SQLite's limit on bound parameters per statement
+        for i in range(0, len(keys), 500):
+            part = keys[i:i+500]
+            rows = conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+            )
+            found.update((k, np.frombuffer(v, dtype=np.float16)) for k, v in rows)
+    return found
+
+def _write_cached_embeddings(rows: List[Tuple[str, bytes]]) -> None:
+    with closing(_open_embedding_cache()) as conn, conn:
+        conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+
+def create_embeddings_cached(client, texts: List[str], model=EMBEDDING_MODEL) -> np.ndarray:
+    keys = [_embedding_cache_key(t, model) for t in texts]
+    try:
+        found = _read_cached_embeddings(keys)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Embedding cache unavailable, embedding all chunks: %s", e)
+        found = {}
+
+    # repeated chunks (intros, outros, music) share a key, so each distinct text is embedded once
+    misses = {}
+    for k, t in zip(keys, texts):
+        if k not in found:
+            misses.setdefault(k, t)
+    if misses:
+        fresh = create_embeddings(client, list(misses.values()), model=model)
+        rows = [(k, vec.astype(np.float16).tobytes()) for k, vec in zip(misses, fresh)]
+        found.update((k, np.frombuffer(v, dtype=np.float16)) for k, v in rows)
+        try:
+            _write_cached_embeddings(rows)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Could not write embedding cache: %s", e)
+
+    # float16 storage rounds the vectors slightly off unit length; restore it for the dot-product search
+    return _normalize_rows(np.asarray([found[k] for k in keys], dtype=np.float32))
+
+# On-disk cache of a video's chunks + embeddings, so a server restart doesn't re-embed known videos.
+# This is also what shares a video's embeddings across sessions: every session reads the same file,
+# so an extra in-memory cache in front of it would only ever hit for videos already on disk.
+# Only real 11-char YouTube ids become file names; extract_video_id's fallback can return raw user
+# input (e.g. "../../x"), which must never reach os.path.join.
+_CACHEABLE_VIDEO_ID_RE = re.compile(r"[0-9A-Za-z_-]{11}")
+
+# The chunk size is part of the key: the file is checked before chunking, so after a CHUNK_CHAR_SIZE
+# change a video must miss and be re-chunked rather than keep loading its old chunks.
+def _video_cache_path(video_id: str, model: str, chunk_size: int) -> Optional[str]:
+    if not _CACHEABLE_VIDEO_ID_RE.fullmatch(video_id):
+        return None
+    return os.path.join(VIDEO_CACHE_DIR, f"{video_id}-{model}-{chunk_size}.npz")
+
+def load_cached_video(video_id: str, model=EMBEDDING_MODEL,
+                      chunk_size: int = CHUNK_CHAR_SIZE) -> Optional[Tuple[List[str], np.ndarray]]:
+    path = _video_cache_path(video_id, model, chunk_size)
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            # stored as float16; widen back and restore unit length for the dot-product search
+            return data["chunks"].tolist(), _normalize_rows(data["embeddings"].astype(np.float32))
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as e:
+        # unreadable / truncated / garbage file: treat as a miss, it gets rewritten after re-embedding
+        logger.warning("Ignoring unreadable video cache %s: %s", path, e)
+        return None
+
+def save_cached_video(video_id: str, chunks: List[str], embeddings: np.ndarray, model=EMBEDDING_MODEL,
+                      chunk_size: int = CHUNK_CHAR_SIZE) -> None:
+    path = _video_cache_path(video_id, model, chunk_size)
+    if path is None:
+        return
+    os.makedirs(VIDEO_CACHE_DIR, exist_ok=True)
+    # write to a temp file in the same directory, then atomically rename it into place, so an
+    # interrupted write or two sessions saving the same video never leave a partial .npz behind
+    fd, tmp_path = tempfile.mkstemp(dir=VIDEO_CACHE_DIR, suffix=".npz.tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            # float16 + compression: a fraction of the float32 size, and fp16 rounding doesn't change the ranking
+            np.savez_compressed(f, chunks=np.array(chunks), embeddings=embeddings.astype(np.float16))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+# Embed a single question through the same batch path, so it gets identical normalization
+def embed_query(client, question: str, model=EMBEDDING_MODEL) -> np.ndarray:
+    return create_embeddings(client, [question], model=model)[0]
+
+# Build a FAISS inner-product index over the normalized chunk embeddings (None if faiss isn't installed)
+def build_index(chunk_embeddings: np.ndarray):
+    if faiss is None:
+        return None
+    dim = chunk_embeddings.shape[1]
+    vectors = np.ascontiguousarray(chunk_embeddings, dtype=np.float32)
+    n = len(vectors)
+    if n >= HNSW_MIN_CHUNKS:
+        # very long videos: graph index with sub-linear query time, no training needed
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    elif n >= IVF_MIN_CHUNKS:
+        # long videos: inverted lists over 8-bit scalar-quantized vectors, 4x smaller than float32;
+        # probing a quarter of the lists keeps recall high at this size. FAISS wants >= 39 training
+        # points per centroid, so nlist is capped at n // 39 to avoid under-trained lists
+        nlist = max(1, min(int(math.sqrt(n)), n // 39))
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, faiss.ScalarQuantizer.QT_8bit,
+                                              faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.nprobe = max(1, nlist // 4)
+    else:
+        index = faiss.IndexFlatIP(dim)
+    index.add(vectors)
+    return index
 
 # Cosine similarity search: returns indices of top_k most similar chunks
-def semantic_search(query_emb: np.ndarray, chunk_embeddings: np.ndarray, top_k=TOP_K) -> List[int]:
+def semantic_search(query_emb: np.ndarray, chunk_embeddings: np.ndarray, top_k=TOP_K, index=None) -> List[int]:
     # query_emb is 1-d normalized vector, chunk_embeddings shape (n_chunks, dim) normalized
-    # similarity = dot product
+    # similarity = dot product (inner product on unit vectors == cosine)
+    top_k = min(top_k, len(chunk_embeddings))
+    if index is not None:
+        _, idx = index.search(query_emb.reshape(1, -1).astype(np.float32), top_k)
+        # FAISS pads with -1 when it finds fewer than top_k results
+        return [i for i in idx[0].tolist() if i >= 0]
     sims = np.dot(chunk_embeddings, query_emb)
-    top_k = min(top_k, len(sims))
-    top_idx = np.argsort(-sims)[:top_k]
-    return top_idx.tolist()
+    # O(n) selection of the top_k, then sort just those few by score
+    top_idx = np.argpartition(sims, -top_k)[-top_k:]
+    return top_idx[np.argsort(-sims[top_idx])].tolist()
+
+# Maximal Marginal Relevance: from the candidates, greedily pick chunks that are relevant to the
+# query but not redundant with chunks already picked, so a small top_k still covers the answer
+def mmr_rerank(query_emb: np.ndarray, chunk_embeddings: np.ndarray, candidate_idxs: List[int],
+               top_k=TOP_K, lambda_mult=MMR_LAMBDA) -> List[int]:
+    # chunk_embeddings may be stored as float16; widen just the candidates
+    cand = chunk_embeddings[candidate_idxs].astype(np.float32, copy=False)
+    relevance = np.dot(cand, query_emb)
+    pairwise = np.dot(cand, cand.T)
+    picked: List[int] = []
+    remaining = list(range(len(candidate_idxs)))
+    while remaining and len(picked) < top_k:
+        redundancy = pairwise[np.ix_(remaining, picked)].max(axis=1) if picked else 0.0
+        scores = lambda_mult * relevance[remaining] - (1 - lambda_mult) * redundancy
+        best = remaining[int(np.argmax(scores))]
+        picked.append(best)
+        remaining.remove(best)
+    return [candidate_idxs[i] for i in picked]
+
+# Semantic answer cache: reuse a previous answer when the new question is a near-duplicate.
+# Matching is on the question alone, so a hit ignores the turns in between: a repeated
+# context-dependent follow-up (e.g. "tell me more") gets the answer it got the first time.
+def find_cached_answer(query_emb: np.ndarray, answer_cache: "deque[Tuple[np.ndarray, str, List[int]]]",
+                       threshold=ANSWER_CACHE_THRESHOLD) -> Optional[Tuple[str, List[int]]]:
+    # answer_cache holds (normalized question embedding, answer, source chunk indices) per past question
+    if not answer_cache:
+        return None
+    sims = np.dot(np.vstack([entry[0] for entry in answer_cache]), query_emb)
+    best = int(np.argmax(sims))
+    if sims[best] < threshold:
+        return None
+    _, answer, top_idxs = answer_cache[best]
+    return answer, top_idxs
+
+# System instruction for the generator: strict instruction to only use provided context.
+# Sent once per request via GenerateContentConfig.system_instruction instead of being pasted into every prompt.
+SYSTEM_INSTRUCTION = (
+    "You are a helpful assistant that answers questions strictly using ONLY the context provided in the prompt."
+    " If the answer is not contained in the context, respond with: 'I don't know — the video transcript does not contain that information.'"
+    " Do not hallucinate. Keep answers concise and cite the chunk numbers you used (e.g. [chunk 2])."
+)
+
+# Per-turn prompt layout; only the three fields change between questions
+PROMPT_TEMPLATE = "Context:\n{context}\n\n{history}\nUser question: {question}\n\nAnswer:"
 
-# Build prompt for the generator: give strict instruction to only use provided context
-def build_prompt(context_chunks: List[str], user_question: str, chat_history: List[Tuple[str,str]] = None) -> str:
+# Build prompt for the generator: only the per-turn parts (context, history, question)
+def build_prompt(context_chunks: List[str], user_question: str, chat_history: "deque[Tuple[str,str]]" = None) -> str:
     """
-    Returns a single string prompt to send to Gemini.
-    The system instruction instructs the model to only answer from the context; be concise and mention sources (timestamps).
+    Returns a single string prompt to send to Gemini (SYSTEM_INSTRUCTION is passed separately).
     We include the top retrieved chunks, prefixed with chunk numbers.
     Optionally include short chat history (previous Q/A).
     """
-    system = (
-        "You are a helpful assistant that answers questions strictly using ONLY the context provided below."
-        " If the answer is not contained in the context, respond with: 'I don't know — the video transcript does not contain that information.'"
-        " Do not hallucinate. Keep answers concise and cite the chunk numbers you used (e.g. [chunk 2])."
-    )
     ctx = "\n\n".join([f"[chunk {i+1}]: {c}" for i,c in enumerate(context_chunks)])
     history_text = ""
     if chat_history:
         # include last few exchanges (safe length)
-        history_text = "\n\nPrevious conversation:\n"
-        for q,a in chat_history[-6:]:
-            history_text += f"Q: {q}\nA: {a}\n"
-    prompt = f"{system}\n\nContext:\n{ctx}\n\n{history_text}\nUser question: {user_question}\n\nAnswer:"
-    return prompt
-
-# Call Gemini to generate the answer (text) given the prompt
-def generate_answer(client, prompt: str, model=GENERATION_MODEL, max_output_tokens: int = 512) -> str:
-    # Using generate_content API
-    # We can disable "thinking" for speed by setting thinking_budget=0 (optional)
-    config = types.GenerateContentConfig(thinking_config=types.ThinkingConfig(thinking_budget=0))
-    response = client.models.generate_content(
+        history_text = "\n\nPrevious conversation:\n" + "".join(
+            f"Q: {q}\nA: {a}\n" for q,a in islice(chat_history, max(0, len(chat_history) - 6), None)
+        )
+    return PROMPT_TEMPLATE.format_map({"context": ctx, "history": history_text, "question": user_question})
+
+# Generation config is the same for every call, so build it once
+# We can disable "thinking" for speed by setting thinking_budget=0 (optional)
+GENERATION_CONFIG = types.GenerateContentConfig(
+    system_instruction=SYSTEM_INSTRUCTION,
+    thinking_config=types.ThinkingConfig(thinking_budget=0),
+)
+
+# Call Gemini to generate the answer (text) given the prompt, yielding text as it arrives
+def generate_answer(client, prompt: str, model=GENERATION_MODEL, max_output_tokens: int = 512) -> Iterator[str]:
+    # Using generate_content_stream API so the first words show up before the full answer is done
+    stream = client.models.generate_content_stream(
         model=model,
         contents=prompt,
-        config=config
+        config=GENERATION_CONFIG
     )
-    # .text is a convenience property returning candidate content
-    return response.text
+    for chunk in stream:
+        # .text is a convenience property returning candidate content (None for empty chunks)
+        if chunk.text:
+            yield chunk.text
 
 # --------- Streamlit UI and app logic ----------
 st.set_page_config(page_title="YouTube Transcript Chat (Gemini)", layout="wide")
@@ -163,7 +443,7 @@ with st.sidebar:
         """
         • Make sure your GEMINI_API_KEY is set as an environment variable before running:
           `export GEMINI_API_KEY='your_key'` (Linux / macOS) or `set` on Windows.\n
-        • This demo stores everything in memory (no DB). For production use, persist embeddings (e.g. FAISS, Pinecone, etc.).\n
+        • Transcripts' chunks and embeddings are cached on disk under `.cache/` (a .npz file per video plus a small SQLite embeddings cache), so reloading a video skips Gemini. For production use, a shared vector store (e.g. Pinecone) is a better fit.\n
         • The Gemini free tier is usable for experimentation via Google AI Studio (see docs link in the main text).
         """
     )
@@ -182,51 +462,72 @@ if clear_btn:
         del st.session_state[k]
     st.experimental_rerun()
 
-if "client" not in st.session_state:
-    try:
-        st.session_state.client = get_gemini_client()
-    except Exception as e:
-        st.error(f"Could not initialize Gemini client: {e}")
-        st.stop()
-
-client = st.session_state.client
+try:
+    client = get_gemini_client()
+except Exception as e:
+    st.error(f"Could not initialize Gemini client: {e}")
+    st.stop()
 
 if load_btn:
     if not video_input:
         st.warning("Please enter a YouTube URL or video id.")
     else:
         video_id = extract_video_id(video_input)
-        st.info(f"Fetching transcript for video id: `{video_id}` ...")
-        try:
-            full_text, segments = fetch_transcript(video_id)
-        except TranscriptsDisabled:
-            st.error("Transcripts are disabled for this video.")
-            st.stop()
-        except NoTranscriptFound:
-            st.error("No transcript found for this video (it may not have subtitles or auto-generated captions).")
-            st.stop()
-        except Exception as e:
-            st.error(f"Failed to fetch transcript: {e}")
-            st.stop()
-
-        st.success("Transcript fetched — chunking text...")
-        chunks = chunk_text(full_text, chunk_size=CHUNK_CHAR_SIZE)
-        st.write(f"Created {len(chunks)} chunks (approx {CHUNK_CHAR_SIZE} chars each).")
-
-        # Create embeddings
-        with st.spinner("Generating embeddings with Gemini..."):
+        cached_video = load_cached_video(video_id, model=EMBEDDING_MODEL, chunk_size=CHUNK_CHAR_SIZE)
+        if cached_video:
+            chunks, chunk_embeddings = cached_video
+            st.success(f"Loaded {len(chunks)} cached chunks and embeddings for video id: `{video_id}`.")
+        else:
+            st.info(f"Fetching transcript for video id: `{video_id}` ...")
             try:
-                chunk_embeddings = create_embeddings(client, chunks, model=EMBEDDING_MODEL)
+                full_text = fetch_transcript(video_id)
+            except TranscriptsDisabled:
+                st.error("Transcripts are disabled for this video.")
+                st.stop()
+            except NoTranscriptFound:
+                st.error("No transcript found for this video (it may not have subtitles or auto-generated captions).")
+                st.stop()
             except Exception as e:
-                st.error(f"Failed to create embeddings: {e}")
+                st.error(f"Failed to fetch transcript: {e}")
+                st.stop()
+
+            st.success("Transcript fetched — chunking text...")
+            chunks = chunk_text(full_text, chunk_size=CHUNK_CHAR_SIZE)
+            if not chunks:
+                # nothing to embed; don't spend an API call (or cache an empty video)
+                st.error("The transcript for this video is empty.")
                 st.stop()
+            st.write(f"Created {len(chunks)} chunks (approx {CHUNK_CHAR_SIZE} chars each).")
+
+            # Create embeddings
+            with st.spinner("Generating embeddings with Gemini..."):
+                try:
+                    chunk_embeddings = create_embeddings_cached(client, chunks, model=EMBEDDING_MODEL)
+                except Exception as e:
+                    st.error(f"Failed to create embeddings: {e}")
+                    st.stop()
+            try:
+                save_cached_video(video_id, chunks, chunk_embeddings, model=EMBEDDING_MODEL,
+                                  chunk_size=CHUNK_CHAR_SIZE)
+            except Exception as e:
+                # the embeddings are already in hand; a failed cache write only costs a re-embed next time
+                logger.warning("Could not write video cache for %s: %s", video_id, e)
 
         # Save to session state
         st.session_state.video_id = video_id
-        st.session_state.transcript_segments = segments
         st.session_state.chunks = chunks
+        st.session_state.faiss_index = build_index(chunk_embeddings)
+        if st.session_state.faiss_index is not None:
+            # the index holds its own copy for search; the session matrix then only feeds MMR over a
+            # few candidates, so keep it at half size (the NumPy fallback search needs float32 for BLAS)
+            chunk_embeddings = chunk_embeddings.astype(np.float16)
         st.session_state.chunk_embeddings = chunk_embeddings
-        st.session_state.chat_history = []  # list of (question, answer)
+        st.session_state.chat_history = deque(maxlen=CHAT_HISTORY_MAX_TURNS)  # (question, answer) pairs
+        # (question embedding, answer, source chunk indices), oldest evicted first
+        st.session_state.answer_cache = deque(maxlen=ANSWER_CACHE_SIZE)
+        # sha1(question) -> embedding, LRU-ordered; question embeddings don't depend on the video,
+        # so keep them across loads
+        st.session_state.setdefault("q_emb_cache", OrderedDict())
         st.success("Embeddings created and stored in session. You can now ask questions below.")
 
 # If embeddings loaded, show chat UI
@@ -237,52 +538,64 @@ if "chunks" in st.session_state:
 
     st.divider()
     st.subheader("Ask a question (answers come only from the transcript)")
-    question = st.text_input("Your question", key="question_input")
-    ask_btn = st.button("Ask")
 
-    if ask_btn:
-        if not question.strip():
-            st.warning("Please type a question.")
-        else:
-            # Embed user question
-            try:
-                q_emb_res = client.models.embed_content(model=EMBEDDING_MODEL, contents=question)
-                q_emb = np.array(q_emb_res.embeddings[0])
-                q_emb = q_emb / (np.linalg.norm(q_emb) + 1e-12)
-            except Exception as e:
-                st.error(f"Failed to embed the question: {e}")
-                st.stop()
+    # Earlier turns as chat bubbles; a new turn only appends its own two bubbles below them
+    for q, a in st.session_state.chat_history:
+        with st.chat_message("user"):
+            st.markdown(q)
+        with st.chat_message("assistant"):
+            st.markdown(a)
+
+    question = st.chat_input("Your question")
+    if question and question.strip():
+        with st.chat_message("user"):
+            st.markdown(question)
+
+        with st.chat_message("assistant"):
+            # Embed user question (a repeated question reuses its embedding, no API round-trip)
+            q_key = hashlib.sha1(question.encode("utf-8")).hexdigest()
+            q_emb_cache = st.session_state.q_emb_cache
+            q_emb = q_emb_cache.get(q_key)
+            if q_emb is None:
+                try:
+                    q_emb = embed_query(client, question, model=EMBEDDING_MODEL)
+                except Exception as e:
+                    st.error(f"Failed to embed the question: {e}")
+                    st.stop()
+                q_emb_cache[q_key] = q_emb
+                if len(q_emb_cache) > QUERY_EMB_CACHE_SIZE:
+                    q_emb_cache.popitem(last=False)
+            else:
+                q_emb_cache.move_to_end(q_key)
 
-            # semantic search
-            top_idxs = semantic_search(q_emb, st.session_state.chunk_embeddings, top_k=TOP_K)
-            retrieved_chunks = [st.session_state.chunks[i] for i in top_idxs]
+            # Near-duplicate of an earlier question? Reuse its answer and skip generation
+            cached = find_cached_answer(q_emb, st.session_state.answer_cache)
+            if cached:
+                answer, top_idxs = cached
+                st.markdown(answer)
+            else:
+                # semantic search for candidates, then MMR down to the few chunks sent to Gemini
+                candidate_idxs = semantic_search(q_emb, st.session_state.chunk_embeddings, top_k=CANDIDATE_K,
+                                                 index=st.session_state.faiss_index)
+                top_idxs = mmr_rerank(q_emb, st.session_state.chunk_embeddings, candidate_idxs, top_k=TOP_K)
+                retrieved_chunks = [st.session_state.chunks[i] for i in top_idxs]
 
-            # Build prompt
-            prompt = build_prompt(retrieved_chunks, question, chat_history=st.session_state.chat_history)
+                # Build prompt
+                prompt = build_prompt(retrieved_chunks, question, chat_history=st.session_state.chat_history)
 
-            # Generate answer
-            with st.spinner("Generating answer with Gemini..."):
+                # Generate answer, rendering it into this bubble as it streams in
                 try:
-                    answer = generate_answer(client, prompt, model=GENERATION_MODEL)
+                    answer = st.write_stream(generate_answer(client, prompt, model=GENERATION_MODEL))
                 except Exception as e:
                     st.error(f"Generation failed: {e}")
                     st.stop()
+                st.session_state.answer_cache.append((q_emb, answer, top_idxs))
+
+            with st.expander("Source chunks used (top results)"):
+                for rank, idx in enumerate(top_idxs, start=1):
+                    st.write(f"[chunk {rank}] — preview: {st.session_state.chunks[idx][:250]}{'...' if len(st.session_state.chunks[idx])>250 else ''}")
 
-            # Save to chat history & display
-            st.session_state.chat_history.append((question, answer))
-            st.markdown("**Answer:**")
-            st.write(answer)
-            st.markdown("---")
-            st.markdown("**Source chunks used (top results):**")
-            for rank, idx in enumerate(top_idxs, start=1):
-                st.write(f"[chunk {rank}] — preview: {st.session_state.chunks[idx][:250]}{'...' if len(st.session_state.chunks[idx])>250 else ''}")
-
-    # show chat history
-    if st.session_state.get("chat_history"):
-        st.subheader("Chat history")
-        for q,a in st.session_state.chat_history[::-1]:
-            st.markdown(f"**Q:** {q}")
-            st.markdown(f"**A:** {a}")
-            st.markdown("---")
+        # Save to chat history
+        st.session_state.chat_history.append((question, answer))
 else:
     st.info("Load a transcript to begin (enter a YouTube URL/ID on the top).")
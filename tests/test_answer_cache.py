@@ -0,0 +1,45 @@
+"""Tests for the per-video semantic answer cache."""
+import os
+import sys
+from collections import deque
+
+import numpy as np
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+def unit(v):
+    v = np.asarray(v, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_empty_cache_misses():
+    assert app.find_cached_answer(unit([1, 0, 0]), deque()) is None
+
+
+def test_repeated_question_hits_after_other_turns():
+    cache = deque(maxlen=app.ANSWER_CACHE_SIZE)
+    what = unit([1, 0, 0])
+    summary = unit([0, 1, 0])
+    cache.append((what, "It is about X.", [0, 3]))
+    cache.append((summary, "Summary of X.", [1]))
+    # asked again later in the conversation, with other turns in between
+    assert app.find_cached_answer(what, cache) == ("It is about X.", [0, 3])
+    assert app.find_cached_answer(summary, cache) == ("Summary of X.", [1])
+
+
+def test_paraphrase_above_threshold_hits_and_unrelated_misses():
+    cache = deque([(unit([1, 0, 0]), "It is about X.", [0])])
+    assert app.find_cached_answer(unit([1, 0.1, 0]), cache) == ("It is about X.", [0])
+    assert app.find_cached_answer(unit([1, 1, 0]), cache) is None
+
+
+def test_cache_is_bounded():
+    cache = deque(maxlen=2)
+    for i in range(3):
+        cache.append((unit(np.eye(3)[i]), f"answer {i}", [i]))
+    assert app.find_cached_answer(unit([1, 0, 0]), cache) is None
+    assert app.find_cached_answer(unit([0, 0, 1]), cache) == ("answer 2", [2])
@@ -0,0 +1,43 @@
+"""Tests for the FAISS index tiers picked by build_index."""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+pytestmark = pytest.mark.skipif(app.faiss is None, reason="faiss is not installed")
+
+
+def random_unit_vectors(n, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    return app._normalize_rows(rng.standard_normal((n, dim)).astype(np.float32))
+
+
+@pytest.mark.parametrize("n,index_type", [
+    (app.IVF_MIN_CHUNKS - 1, "IndexFlatIP"),
+    (app.IVF_MIN_CHUNKS, "IndexIVFScalarQuantizer"),
+    (app.HNSW_MIN_CHUNKS, "IndexHNSWFlat"),
+])
+def test_index_tier_finds_exact_nearest_neighbour(n, index_type):
+    vectors = random_unit_vectors(n)
+    index = app.build_index(vectors)
+    assert type(index).__name__ == index_type
+    assert index.ntotal == n
+    rng = np.random.default_rng(1)
+    for i in rng.choice(n, size=20, replace=False):
+        # a query slightly off a stored vector: that vector is the exact nearest neighbour
+        noise = 0.05 * rng.standard_normal(vectors.shape[1]).astype(np.float32)
+        query = app._normalize_rows((vectors[i] + noise)[None, :])[0]
+        assert int(np.argmax(vectors @ query)) == i
+        assert app.semantic_search(query, vectors, top_k=2, index=index)[0] == i
+
+
+def test_ivf_lists_are_adequately_trained():
+    index = app.build_index(random_unit_vectors(app.IVF_MIN_CHUNKS))
+    # FAISS warns below 39 training points per centroid
+    assert app.IVF_MIN_CHUNKS // index.nlist >= 39
@@ -0,0 +1,70 @@
+"""Regression tests pinning chunk_text to the greedy sentence-packing loop it replaced."""
+import os
+import random
+import sys
+
+import pytest
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+def greedy_chunk_text(text, chunk_size):
+    # the greedy loop as of chunk0-22 (the baseline loop plus its skip of empty pieces), as the reference
+    sentences = app._SENTENCE_SPLIT_RE.split(text)
+    chunks = []
+    cur = ""
+    for s in sentences:
+        if not s.strip():
+            continue
+        if len(cur) + len(s) + 1 <= chunk_size:
+            cur += (" " + s) if cur else s
+        else:
+            if cur:
+                chunks.append(cur.strip())
+            if len(s) > chunk_size:
+                for i in range(0, len(s), chunk_size):
+                    chunks.append(s[i:i+chunk_size].strip())
+                cur = ""
+            else:
+                cur = s
+    if cur:
+        chunks.append(cur.strip())
+    return chunks
+
+
+CASES = [
+    ("", 10),
+    ("   \n\n  \n", 10),
+    ("One sentence.", 100),
+    # sentences that exactly fill, fall one short of, and overflow the chunk by one character
+    ("abcd. efgh. ijkl.", 12),
+    ("abcd. efgh. ijkl.", 11),
+    ("abcd. efgh. ijkl.", 13),
+    ("x" * 10, 10),
+    ("x" * 9, 10),
+    ("x" * 11, 10),
+    # over-long sentences get hard-split, before, between and after normal ones
+    ("y" * 35 + ". short.", 10),
+    ("short. " + "z" * 25 + ". tail one.", 10),
+    ("a. " + "w" * 20, 10),
+    # blank lines and newlines as separators
+    ("first line\n\nsecond line\nthird. fourth? fifth!", 15),
+    ("para one.\n\n\npara two.\n \npara three.", 12),
+]
+
+
+@pytest.mark.parametrize("text,chunk_size", CASES)
+def test_matches_greedy_reference(text, chunk_size):
+    assert app.chunk_text(text, chunk_size) == greedy_chunk_text(text, chunk_size)
+
+
+def test_matches_greedy_reference_fuzz():
+    rng = random.Random(1234)
+    pieces = ["a", "bb", "cccc", "word", "longerword", ".", "?", "!", " ", " ", " ", "\n", "\n\n", ". ", "x" * 30]
+    for _ in range(500):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 60)))
+        chunk_size = rng.randint(1, 40)
+        assert app.chunk_text(text, chunk_size) == greedy_chunk_text(text, chunk_size), (text, chunk_size)
@@ -0,0 +1,56 @@
+"""Regression tests pinning extract_video_id's single regex to the original two-pattern loop."""
+import os
+import random
+import re
+import sys
+
+import pytest
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+def two_pattern_extract_video_id(url_or_id):
+    # the original implementation: the v=/ pattern is tried first, the end-anchored id second
+    patterns = [
+        r"(?:v=|\/)([0-9A-Za-z_-]{11})",          # v=VIDEOID or /VIDEOID
+        r"([0-9A-Za-z_-]{11})$"                   # plain id at end
+    ]
+    for p in patterns:
+        m = re.search(p, url_or_id)
+        if m:
+            return m.group(1)
+    return url_or_id.strip()
+
+
+CASES = [
+    "dQw4w9WgXcQ",
+    "  dQw4w9WgXcQ  ",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42s",
+    "https://youtu.be/dQw4w9WgXcQ",
+    "https://www.youtube.com/embed/dQw4w9WgXcQ?start=10",
+    "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+    # both patterns match: the v= id must win over the trailing 11 characters
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PLabcdefghijk",
+    "https://example.com/abcdefghijk/x?list=PLzyxwvutsrqp",
+    "dQw4w9WgXcQ\n",
+    "not a video",
+    "../../x",
+    "",
+]
+
+
+@pytest.mark.parametrize("url_or_id", CASES)
+def test_matches_two_pattern_reference(url_or_id):
+    assert app.extract_video_id(url_or_id) == two_pattern_extract_video_id(url_or_id)
+
+
+def test_matches_two_pattern_reference_fuzz():
+    rng = random.Random(1234)
+    pieces = ["v=", "/", "?", "&", "=", " ", "\n", "abc", "dQw4w9WgXcQ", "ABCDEFGHIJK", "-_", "x" * 11, "youtu.be"]
+    for _ in range(2000):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+        assert app.extract_video_id(text) == two_pattern_extract_video_id(text), text
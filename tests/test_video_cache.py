@@ -0,0 +1,84 @@
+"""Tests for the per-video .npz cache of chunks and embeddings."""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+VIDEO_ID = "dQw4w9WgXcQ"
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "VIDEO_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def random_embeddings(n, dim=16):
+    rng = np.random.default_rng(0)
+    return app._normalize_rows(rng.standard_normal((n, dim)).astype(np.float32))
+
+
+@pytest.mark.parametrize("video_id", ["../../x", "../../../etc/passwd", "dQw4w9WgXc/", "short", ""])
+def test_unsafe_video_id_has_no_path(video_id, cache_dir):
+    assert app._video_cache_path(video_id, "model", 2000) is None
+    app.save_cached_video(video_id, ["a"], random_embeddings(1))
+    assert app.load_cached_video(video_id) is None
+    assert os.listdir(cache_dir) == []
+
+
+def test_path_is_keyed_on_model_and_chunk_size(cache_dir):
+    assert app._video_cache_path(VIDEO_ID, "m", 2000) == os.path.join(str(cache_dir), f"{VIDEO_ID}-m-2000.npz")
+    assert app._video_cache_path(VIDEO_ID, "m", 1000) != app._video_cache_path(VIDEO_ID, "m", 2000)
+
+
+def test_save_load_round_trip(cache_dir):
+    chunks = ["first chunk.", "second chunk, with ünïcode.", "third"]
+    embeddings = random_embeddings(len(chunks))
+    app.save_cached_video(VIDEO_ID, chunks, embeddings)
+    loaded = app.load_cached_video(VIDEO_ID)
+    assert loaded is not None
+    loaded_chunks, loaded_embeddings = loaded
+    assert loaded_chunks == chunks
+    assert loaded_embeddings.dtype == np.float32
+    assert loaded_embeddings.shape == embeddings.shape
+    np.testing.assert_allclose(np.linalg.norm(loaded_embeddings, axis=1), 1.0, rtol=1e-6)
+    np.testing.assert_allclose(loaded_embeddings, embeddings, atol=1e-3)
+    # no temp files left behind
+    assert os.listdir(cache_dir) == [f"{VIDEO_ID}-{app.EMBEDDING_MODEL}-{app.CHUNK_CHAR_SIZE}.npz"]
+
+
+def test_other_chunk_size_misses(cache_dir):
+    app.save_cached_video(VIDEO_ID, ["a"], random_embeddings(1), chunk_size=2000)
+    assert app.load_cached_video(VIDEO_ID, chunk_size=1000) is None
+
+
+def test_missing_file_misses():
+    assert app.load_cached_video(VIDEO_ID) is None
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda data: b"",
+    lambda data: b"not a zip file at all",
+    lambda data: data[:len(data) // 2],
+    lambda data: data[:-10],
+])
+def test_unreadable_file_misses(corrupt, cache_dir):
+    app.save_cached_video(VIDEO_ID, ["a", "b"], random_embeddings(2))
+    path = app._video_cache_path(VIDEO_ID, app.EMBEDDING_MODEL, app.CHUNK_CHAR_SIZE)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(corrupt(data))
+    assert app.load_cached_video(VIDEO_ID) is None
+
+
+def test_file_missing_arrays_misses(cache_dir):
+    path = app._video_cache_path(VIDEO_ID, app.EMBEDDING_MODEL, app.CHUNK_CHAR_SIZE)
+    np.savez(path, chunks=np.array(["a"]))
+    assert app.load_cached_video(VIDEO_ID) is None